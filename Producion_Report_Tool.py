@@ -1,64 +1,280 @@
 import pandas as pd
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import numpy as np
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.chart import BarChart, Reference
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+import xlsxwriter
+from xlsxwriter.exceptions import FileCreateError, XlsxWriterException
 import traceback
+import functools
+import argparse
+import logging
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+# pandas learned the calamine engine in 2.2; decide once instead of probing with a failing read
+CALAMINE_ENGINE = python_calamine is not None and tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']
+NA_DATE_VALUES = {'WIP', 'NA', 'N/A', ''}
+# Zero-based index for every column letter from A to ZZ
+COL_IDX = {get_column_letter(i): i - 1 for i in range(1, 703)}
+PROCESS_DTYPE = pd.CategoricalDtype(['Key', 'QC', 'Final'])
+# Only columns A-AC of the input sheet are used
+INPUT_COL_COUNT = COL_IDX['AC'] + 1
+# Errors a single sheet build can raise; they skip that sheet instead of the whole workbook
+SHEET_ERRORS = (AttributeError, KeyError, TypeError, ValueError, XlsxWriterException)
+# Parsed input frames, keyed by the SHA-1 of the input file's contents
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'prodreport')
+# Bump when load_file or _parquet_safe change what a cached frame holds
+CACHE_VERSION = 2
+# Cached inputs kept besides the current one; older entries are pruned on write
+CACHE_KEEP = 20
+# Input columns that are re-parsed as dates or record counts, so caching them as text loses nothing
+PARSED_INPUT_COLS = {COL_IDX[col] for col in ['K', 'L', 'M', 'N', 'V', 'W', 'X', 'Z', 'AA', 'AC']}
+OUTPUT_FILE = "Production_Performance_Report.xlsx"
+# Log level used for each dialog kind when running without Tk
+NOTIFY_LEVELS = {'showinfo': logging.INFO, 'showwarning': logging.WARNING, 'showerror': logging.ERROR}
+
+log = logging.getLogger(__name__)
+
+def _parse_iso(value):
+    """Parse an ISO-8601 string with ciso8601, returning None if unavailable or not ISO"""
+    if ciso8601 is None or not isinstance(value, str):
+        return None
+    try:
+        return ciso8601.parse_datetime_as_naive(value.strip())
+    except ValueError:
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_cached(date_str):
+    """Parse one date value; cached because date columns repeat the same values heavily"""
+    try:
+        if pd.isna(date_str) or str(date_str).strip().upper() in NA_DATE_VALUES:
+            return pd.NaT
+        # Fast path for ISO-8601 strings
+        iso = _parse_iso(date_str)
+        if iso is not None:
+            return pd.Timestamp(iso)
+        # Try multiple date formats
+        for fmt in DATE_FORMATS:
+            try:
+                return pd.to_datetime(date_str, format=fmt)
+            except:
+                continue
+        return pd.to_datetime(date_str)  # Try pandas' automatic parsing
+    except Exception as e:
+        log.warning("Could not parse date '%s': %s", date_str, e)
+        return pd.NaT
+
 class ProductionReporter:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.withdraw()
+    def __init__(self, interactive=True):
+        # Batch runs report through logging and never import Tk
+        self.interactive = interactive
+        self.root = None
+        if interactive:
+            # Tk is imported here so using the class as a library does not pay for it at import time
+            import tkinter as tk
+            from tkinter import filedialog, messagebox
+            self._filedialog = filedialog
+            self._messagebox = messagebox
+            self.root = tk.Tk()
+            self.root.withdraw()
+        # Warnings raised while processing data, shown together from the main thread
+        self._warnings = []
+        # Shared cell formats, created once per workbook by _build_formats
+        self._header_fmt = None
+        self._date_fmt = None
+
+    def _notify(self, kind, title, message):
+        """Show a messagebox dialog of the given kind, or log it when running in batch mode"""
+        if self.interactive:
+            getattr(self._messagebox, kind)(title, message)
+        else:
+            log.log(NOTIFY_LEVELS[kind], "%s: %s", title, message)
 
     def select_file(self):
         """Allow user to select input Excel file with error handling"""
         try:
-            file_path = filedialog.askopenfilename(
+            file_path = self._filedialog.askopenfilename(
                 title="Select Production Data File",
                 filetypes=[("Excel files", "*.xlsx;*.xls"), ("All files", "*.*")]
             )
             if not file_path:
-                messagebox.showinfo("Info", "No file selected. Exiting.")
+                self._notify('showinfo', "Info", "No file selected. Exiting.")
                 sys.exit(0)
             return file_path
         except Exception as e:
-            messagebox.showerror("File Selection Error", 
-                                f"Error selecting file:\n{str(e)}")
+            self._notify('showerror', "File Selection Error",
+                         f"Error selecting file:\n{str(e)}")
             sys.exit(1)
 
+    def load_file(self, file_path):
+        """Read columns A-AC of the input sheet, preferring the calamine engine when it is installed"""
+        # usecols would raise on sheets narrower than A-AC, so read them whole and slice
+        if CALAMINE_ENGINE:
+            try:
+                return pd.read_excel(file_path, engine="calamine").iloc[:, :INPUT_COL_COUNT]
+            except python_calamine.CalamineError as e:
+                log.warning("calamine could not read the file, falling back to openpyxl: %s", e)
+        
+        if not file_path.lower().endswith(('.xlsx', '.xlsm')):
+            # Legacy .xls files need pandas' xlrd engine
+            return pd.read_excel(file_path).iloc[:, :INPUT_COL_COUNT]
+        
+        # Stream rows through openpyxl's read-only mode
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            data = list(wb.active.iter_rows(min_col=1, max_col=INPUT_COL_COUNT, values_only=True))
+        finally:
+            wb.close()
+        if not data:
+            return pd.DataFrame()
+        return pd.DataFrame(data[1:], columns=data[0])
+
+    def load_cached(self, file_path):
+        """Load the input through a Parquet cache so repeated runs on the same file skip the Excel parse"""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        # calamine and openpyxl convert cell types differently, so each engine gets its own entry
+        engine = 'calamine' if CALAMINE_ENGINE else 'openpyxl'
+        cache_path = os.path.join(CACHE_DIR, f"{digest.hexdigest()}-v{CACHE_VERSION}-{engine}.parquet")
+        
+        if os.path.exists(cache_path):
+            try:
+                return pd.read_parquet(cache_path)
+            except Exception as e:
+                log.warning("Could not read cached input '%s': %s", cache_path, e)
+        
+        input_df = self.load_file(file_path)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self._parquet_safe(input_df).to_parquet(cache_path)
+            self._prune_cache(cache_path)
+        except Exception as e:
+            # Caching is optional (needs pyarrow or fastparquet); never fail the run over it
+            log.warning("Could not cache input data: %s", e)
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+        return input_df
+
+    def _prune_cache(self, keep_path):
+        """Remove cache entries from other versions and all but the newest CACHE_KEEP other inputs"""
+        marker = f"-v{CACHE_VERSION}-"
+        current, stale = [], []
+        for name in os.listdir(CACHE_DIR):
+            path = os.path.join(CACHE_DIR, name)
+            if not name.endswith('.parquet') or path == keep_path:
+                continue
+            (current if marker in name else stale).append(path)
+        # Another run may be pruning too; a file that is already gone sorts last and is skipped below
+        current.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0, reverse=True)
+        for path in stale + current[CACHE_KEEP:]:
+            try:
+                os.remove(path)
+            except OSError:
+                # A locked or vanished entry is retried on the next write; the new cache file stays valid
+                pass
+
+    def _parquet_safe(self, df):
+        """Copy of df that Parquet can store: positional column names, mixed date/count columns as text"""
+        df = df.copy()
+        # Blank or repeated headers would collide; the pipelines only use column positions
+        df.columns = [f"col{i}" for i in range(df.shape[1])]
+        for i in range(df.shape[1]):
+            col = df.iloc[:, i]
+            if col.dtype != object or col.dropna().map(type).nunique() <= 1:
+                continue
+            if i not in PARSED_INPUT_COLS:
+                # Text would change how names and statuses are written, so such inputs are not cached
+                raise ValueError(f"column {get_column_letter(i + 1)} mixes value types")
+            # Dates mixed with 'WIP' markers and the like; the date and numeric parsers accept the text form
+            df.isetitem(i, col.where(col.isna(), col.astype(str)))
+        return df
+
     def safe_date_parse(self, date_str):
         """Handle WIP and other non-date values gracefully with better error handling"""
         try:
-            if pd.isna(date_str) or str(date_str).strip().upper() in ['WIP', 'NA', 'N/A', '']:
-                return pd.NaT
-            # Try multiple date formats
-            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']:
+            return _parse_date_cached(date_str)
+        except TypeError:
+            # Unhashable values cannot go through the cache
+            return _parse_date_cached.__wrapped__(date_str)
+
+    def _vector_parse_dates(self, series):
+        """Parse a whole date column in one pass, treating WIP/NA markers as missing"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        na_mask = series.isna() | series.astype(str).str.strip().str.upper().isin(NA_DATE_VALUES)
+        values = series.mask(na_mask)
+        non_null = values.dropna()
+        if non_null.empty:
+            return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        
+        # Probe the first value to pick one format for the whole column
+        fmt = None
+        probe = non_null.iloc[0]
+        if isinstance(probe, str):
+            for candidate in DATE_FORMATS:
                 try:
-                    return pd.to_datetime(date_str, format=fmt)
-                except:
+                    datetime.strptime(probe.strip(), candidate)
+                    fmt = candidate
+                    break
+                except ValueError:
                     continue
-            return pd.to_datetime(date_str)  # Try pandas' automatic parsing
-        except Exception as e:
-            print(f"Warning: Could not parse date '{date_str}': {str(e)}")
-            return pd.NaT
+        
+        if fmt:
+            parsed = pd.to_datetime(values, format=fmt, errors='coerce', cache=True)
+        elif _parse_iso(probe) is not None:
+            # ISO-8601 timestamps go through the ciso8601 C parser
+            iso_values = np.fromiter((_parse_iso(x) for x in values), dtype=object, count=len(values))
+            parsed = pd.to_datetime(pd.Series(iso_values, index=values.index), errors='coerce')
+        elif not isinstance(probe, str):
+            # Cells read as datetime objects convert directly
+            parsed = pd.to_datetime(values, errors='coerce', cache=True)
+        else:
+            parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        
+        # Remaining values are parsed one unique value at a time
+        leftover = parsed.isna() & values.notna()
+        if leftover.any():
+            remaining = values[leftover]
+            mapping = {u: _parse_date_cached(u) for u in remaining.unique()}
+            parsed.loc[leftover] = pd.to_datetime(remaining.map(mapping), errors='coerce')
+        return parsed
+
+    def _period_starts(self, dates):
+        """Return week (Monday) and month start dates for a datetime column without building Periods"""
+        week = (dates - pd.to_timedelta(dates.dt.weekday, unit='D')).dt.normalize()
+        month = pd.Series(dates.to_numpy().astype('datetime64[M]').astype('datetime64[ns]'), index=dates.index)
+        return week, month
+
+    def _days_between(self, end, start):
+        """Whole days from start to end as float64, NaN where either date is missing"""
+        days = (end.to_numpy() - start.to_numpy()) / np.timedelta64(1, 'D')
+        return np.floor(days)
 
     def excel_column_to_index(self, col_letters):
         """Convert Excel column letters to zero-based index with validation"""
-        try:
-            index = 0
-            for char in col_letters.upper():
-                if not char.isalpha():
-                    raise ValueError(f"Invalid column character: {char}")
-                index = index * 26 + (ord(char) - ord('A')) + 1
-            return index - 1
-        except Exception as e:
-            messagebox.showerror("Column Conversion Error", 
-                                f"Error converting column '{col_letters}': {str(e)}")
-            return None
+        index = COL_IDX.get(str(col_letters).upper())
+        if index is None:
+            self._notify('showerror', "Column Conversion Error",
+                         f"Error converting column '{col_letters}': Invalid column specification")
+        return index
 
     def validate_dataframe(self, df, required_cols, sheet_name=""):
         """Validate that dataframe contains required columns"""
@@ -66,165 +282,189 @@ class ProductionReporter:
             return False
         missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
-            messagebox.showwarning("Missing Columns", 
-                                  f"Sheet {sheet_name} is missing columns: {', '.join(missing_cols)}")
+            self._notify('showwarning', "Missing Columns",
+                         f"Sheet {sheet_name} is missing columns: {', '.join(missing_cols)}")
             return False
         return True
 
-    def format_sheet(self, ws, headers, date_cols):
-        """Apply consistent formatting to worksheets with error handling"""
+    def format_sheet(self, ws, headers, date_cols, rows, df=None):
+        """Set column widths and date formats on a worksheet before its rows are written"""
         try:
-            header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-            header_font = Font(color="FFFFFF", bold=True)
-            
-            # Format headers
-            for col in ws.iter_cols(min_row=1, max_row=1):
-                for cell in col:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = Alignment(horizontal="center")
-            
-            # Format dates
-            for col_name, df_col in date_cols.items():
-                if col_name in headers:
-                    col_idx = headers.index(col_name) + 1
-                    for cell in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=col_idx, max_col=col_idx):
-                        if cell[0].value is not None:
-                            cell[0].number_format = 'MM/DD/YYYY'
-            
             # Auto-adjust column widths with limits
-            for column in ws.columns:
-                max_length = 0
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        continue
+            header_lengths = [len(str(header)) for header in headers]
+            if df is not None:
+                # Column statistics from the source DataFrame, one pass per column
+                value_lengths = df.astype(str).apply(lambda s: s.str.len().max()).fillna(0).to_numpy()
+                widths = np.maximum(value_lengths, header_lengths)
+            else:
+                widths = header_lengths
+                for row in rows:
+                    for col_idx, value in enumerate(row):
+                        try:
+                            widths[col_idx] = max(widths[col_idx], len(str(value)))
+                        except:
+                            continue
+            
+            # Date columns get the date format as their column format, which applies to every unformatted cell
+            date_idx = {headers.index(col_name) for col_name in date_cols if col_name in headers}
+            for col_idx, max_length in enumerate(widths):
                 adjusted_width = min((max_length + 2) * 1.2, 50)  # Cap at 50
-                ws.column_dimensions[column[0].column_letter].width = adjusted_width
+                ws.set_column(col_idx, col_idx, adjusted_width, self._date_fmt if col_idx in date_idx else None)
         except Exception as e:
-            print(f"Warning: Error formatting sheet: {str(e)}")
+            log.warning("Error formatting sheet: %s", e)
 
-    def add_production_chart(self, ws, df, report_type):
+    def add_production_chart(self, wb, ws, df, report_type, last_row):
         """Add production volume charts to reports with error handling"""
         try:
             if len(df) < 1:
                 return
-                
-            chart = BarChart()
-            chart.type = "col"
-            chart.style = 10
-            chart.title = f"{report_type} Production Volume"
-            chart.y_axis.title = 'Records'
-            chart.x_axis.title = report_type
             
             # Find record count columns (skip first column which is date)
-            record_cols = [col for col in df.columns[1:] if 'Total Rec' in col]
-            if not record_cols:
+            # Index.str.contains already returns a boolean ndarray
+            record_mask = df.columns.str.contains('Total Rec', regex=False)
+            record_cols = np.flatnonzero(record_mask[1:]) + 1
+            if not len(record_cols):
                 return
-            
-            data_start_col = 2  # Skip first column (date)
-            data_end_col = len(record_cols) + 1
-            
-            data = Reference(ws, min_col=data_start_col, max_col=data_end_col, 
-                           min_row=1, max_row=ws.max_row)
-            cats = Reference(ws, min_col=1, min_row=2, max_row=ws.max_row)
-            
-            chart.add_data(data, titles_from_data=True)
-            chart.set_categories(cats)
-            
-            ws.add_chart(chart, f"H{ws.max_row + 2}")
+                
+            chart = wb.add_chart({'type': 'column'})
+            chart.set_style(10)
+            chart.set_title({'name': f"{report_type} Production Volume"})
+            chart.set_y_axis({'name': 'Records'})
+            chart.set_x_axis({'name': report_type})
+            
+            # Row 0 holds the headers; only the Total Rec. columns are charted
+            sheet = ws.get_name()
+            for col in record_cols.tolist():
+                chart.add_series({
+                    'name': [sheet, 0, col],
+                    'categories': [sheet, 1, 0, last_row - 1, 0],
+                    'values': [sheet, 1, col, last_row - 1, col],
+                })
+            
+            ws.insert_chart(last_row + 1, 7, chart)
         except Exception as e:
-            print(f"Warning: Error adding production chart: {str(e)}")
+            log.warning("Error adding production chart: %s", e)
 
-    def add_personnel_chart(self, ws, df):
+    def add_personnel_chart(self, wb, ws, df):
         """Add horizontal bar chart for personnel performance with error handling"""
         try:
             if len(df) < 1:
                 return
                 
-            chart = BarChart()
-            chart.type = "bar"  # Horizontal bar chart
-            chart.style = 10
-            chart.title = "Top Performers by Total Records"
-            chart.x_axis.title = 'Records'
-            chart.y_axis.title = 'Personnel'
+            chart = wb.add_chart({'type': 'bar'})  # Horizontal bar chart
+            chart.set_style(10)
+            chart.set_title({'name': "Top Performers by Total Records"})
+            chart.set_x_axis({'name': 'Records'})
+            chart.set_y_axis({'name': 'Personnel'})
             
             # Get top 15 performers (or all if less than 15)
             top_count = min(15, len(df))
             
             # Data references
-            data = Reference(ws, min_col=4, max_col=4, min_row=2, max_row=top_count+1)  # Total Rec. column
-            cats = Reference(ws, min_col=2, min_row=2, max_row=top_count+1)  # Name column
-            
-            chart.add_data(data)
-            chart.set_categories(cats)
+            sheet = ws.get_name()
+            chart.add_series({
+                'categories': [sheet, 1, 1, top_count, 1],  # Name column
+                'values': [sheet, 1, 3, top_count, 3],  # Total Rec. column
+            })
             
             # Position chart to the right of the data
-            ws.add_chart(chart, "F2")
+            ws.insert_chart('F2', chart)
         except Exception as e:
-            print(f"Warning: Error adding personnel chart: {str(e)}")
+            log.warning("Error adding personnel chart: %s", e)
 
-    def add_personnel_trend_chart(self, ws, df, period_type):
-        """Add line chart showing personnel performance trend with error handling"""
+    def add_personnel_trend_chart(self, wb, ws, df, period_type, last_row):
+        """Add column chart showing personnel performance trend with error handling"""
         try:
             if len(df) < 1:
                 return
                 
-            top_names = df.groupby('Name')['Total Rec.'].sum().nlargest(5).index
-            
-            chart = BarChart()
-            chart.type = "col"
-            chart.style = 10
-            chart.title = f"Top Performers Trend ({period_type})"
-            chart.y_axis.title = 'Records'
-            chart.x_axis.title = period_type
+            top_names = df.groupby('Name', observed=True)['Total Rec.'].sum().nlargest(5).index
             
             # Filter data for top performers
             filtered_df = df[df['Name'].isin(top_names)]
             if len(filtered_df) == 0:
                 return
-                
+            
+            period_col, period_fmt = {'Weekly': ('Week', '%Y-%m-%d'), 'Monthly': ('Month', '%Y-%m')}[period_type]
             pivot_data = filtered_df.pivot_table(
-                index=period_type.lower(),
+                index=period_col,
                 columns='Name',
                 values='Total Rec.',
-                aggfunc='sum'
+                aggfunc='sum',
+                observed=True
             ).fillna(0)
+            pivot_data.index = pivot_data.index.strftime(period_fmt)
             
-            # Add data to worksheet for charting
-            start_row = ws.max_row + 1
-            for r in dataframe_to_rows(pivot_data.reset_index(), index=False, header=True):
-                ws.append(r)
+            # Add data to worksheet for charting, below the rows already written
+            start_row = last_row
+            ws.write_row(start_row, 0, [period_col] + [str(name) for name in pivot_data.columns])
+            for offset, (period, values) in enumerate(zip(pivot_data.index, pivot_data.to_numpy().tolist()), 1):
+                ws.write_row(start_row + offset, 0, [period] + values)
+            end_row = start_row + len(pivot_data)
             
             # Create chart
-            data = Reference(ws, 
-                           min_col=2, 
-                           max_col=len(top_names)+1,
-                           min_row=start_row,
-                           max_row=ws.max_row)
-            cats = Reference(ws,
-                           min_col=1,
-                           min_row=start_row + 1,
-                           max_row=ws.max_row)
-            
-            chart.add_data(data, titles_from_data=True)
-            chart.set_categories(cats)
-            
-            ws.add_chart(chart, f"H{ws.max_row + 2}")
+            chart = wb.add_chart({'type': 'column'})
+            chart.set_style(10)
+            chart.set_title({'name': f"Top Performers Trend ({period_type})"})
+            chart.set_y_axis({'name': 'Records'})
+            chart.set_x_axis({'name': period_type})
+            
+            sheet = ws.get_name()
+            for col in range(1, len(pivot_data.columns) + 1):
+                chart.add_series({
+                    'name': [sheet, start_row, col],
+                    'categories': [sheet, start_row + 1, 0, end_row, 0],
+                    'values': [sheet, start_row + 1, col, end_row, col],
+                })
+            
+            ws.insert_chart(end_row + 2, 7, chart)
         except Exception as e:
-            print(f"Warning: Error adding trend chart: {str(e)}")
+            log.warning("Error adding trend chart: %s", e)
+
+    def _process(self, input_df, cols, names, name_col, date_cols, end_col, process):
+        """Extract one process's columns and add processing, period and (for Key) status columns"""
+        if None in cols:
+            raise ValueError(f"Invalid column specification for {process} data")
+            
+        # iloc with a column list already returns a new frame, so only the labels need replacing
+        df = input_df.iloc[:, cols]
+        df.columns = names
+        df[name_col] = df[name_col].astype('category')
+        # Non-numeric record counts become NaN and are dropped with the other missing rows
+        df['Total Rec.'] = pd.to_numeric(df['Total Rec.'], errors='coerce', downcast='integer')
+        
+        for date_col in date_cols:
+            df[date_col] = self._vector_parse_dates(df[date_col])
+        
+        df = df.dropna(subset=[name_col, 'Total Rec.'])
+        if not df.empty:
+            # end_col is the date that closes the process: Indate, or Shipment Date for Final
+            df['Processing Days'] = self._days_between(df[end_col], df['Outdate'])
+            if process == 'Key':
+                df['On Time Status'] = np.where(df['Indate'].values <= df['Duedate'].values, 'On Time', 'Delayed')
+            df['Week'], df['Month'] = self._period_starts(df[end_col])
+            df['Process'] = pd.Series(process, index=df.index, dtype=PROCESS_DTYPE)
+        return df
+
+    def flush_warnings(self, title="Report Warnings"):
+        """Show the collected warnings in one summary dialog instead of one modal per warning"""
+        if self._warnings:
+            self._notify('showwarning', title, "\n".join(f"{source}: {message}" for source, message in self._warnings))
+        self._warnings.clear()
 
     def process_input_data(self, input_df):
         """Process all data including personnel performance reports with comprehensive error handling"""
         results = {
             'Key': {'df': None, 'cols': ['J', 'K', 'L', 'M', 'N'], 
-                   'names': ['Key Branch', 'Outdate', 'Duedate', 'Indate', 'Total Rec.']},
+                   'names': ['Key Branch', 'Outdate', 'Duedate', 'Indate', 'Total Rec.'],
+                   'name_col': 'Key Branch', 'date_cols': ['Outdate', 'Duedate', 'Indate'], 'end_col': 'Indate'},
             'QC': {'df': None, 'cols': ['U', 'V', 'W', 'X'], 
-                  'names': ['QC Branch', 'Outdate', 'Indate', 'Total Rec.']},
+                  'names': ['QC Branch', 'Outdate', 'Indate', 'Total Rec.'],
+                  'name_col': 'QC Branch', 'date_cols': ['Outdate', 'Indate'], 'end_col': 'Indate'},
             'Final': {'df': None, 'cols': ['X', 'Y', 'Z', 'AA', 'AB', 'AC'],
-                     'names': ['Total Rec.', 'Final Person', 'Outdate', 'Indate', 'Status', 'Shipment Date']},
+                     'names': ['Total Rec.', 'Final Person', 'Outdate', 'Indate', 'Status', 'Shipment Date'],
+                     'name_col': 'Final Person', 'date_cols': ['Outdate', 'Indate', 'Shipment Date'],
+                     'end_col': 'Shipment Date'},
             'Weekly': {'df': None},
             'Monthly': {'df': None},
             'Personnel': {'df': None},
@@ -235,186 +475,80 @@ class ProductionReporter:
         try:
             # Validate input dataframe
             if input_df.empty:
-                messagebox.showerror("Input Error", "The selected file is empty.")
+                self._notify('showerror', "Input Error", "The selected file is empty.")
                 return None
             
+            # Resolve column letters for all processes in one pass
+            col_indices = {process: [self.excel_column_to_index(col) for col in results[process]['cols']]
+                           for process in ['Key', 'QC', 'Final']}
 
-            # Process Key data (columns J-N)
-            try:
-                key_cols = [self.excel_column_to_index(col) for col in results['Key']['cols']]
-                if None in key_cols:
-                    raise ValueError("Invalid column specification for Key data")
-                    
-                key_df = input_df.iloc[:, key_cols].copy()
-                key_df.columns = results['Key']['names']
-                
-                for date_col in ['Outdate', 'Duedate', 'Indate']:
-                    key_df[date_col] = key_df[date_col].apply(self.safe_date_parse)
-                
-                key_df = key_df.dropna(subset=['Key Branch', 'Total Rec.'])
-                if not key_df.empty:
-                    key_df['Processing Days'] = (key_df['Indate'] - key_df['Outdate']).dt.days
-                    key_df['On Time Status'] = (key_df['Indate'] <= key_df['Duedate']).map({True: 'On Time', False: 'Delayed'})
-                    key_df['Week'] = key_df['Indate'].dt.to_period('W').dt.start_time
-                    key_df['Month'] = key_df['Indate'].dt.to_period('M').dt.start_time
-                    key_df['Process'] = 'Key'
-                
-                results['Key']['df'] = key_df
-            except Exception as e:
-                messagebox.showwarning("Key Data Warning", 
-                                      f"Error processing Key data: {str(e)}\nContinuing without Key data.")
-                results['Key']['df'] = pd.DataFrame()
-
-            # Process QC data (columns U-X)
-            try:
-                qc_cols = [self.excel_column_to_index(col) for col in results['QC']['cols']]
-                if None in qc_cols:
-                    raise ValueError("Invalid column specification for QC data")
-                    
-                qc_df = input_df.iloc[:, qc_cols].copy()
-                qc_df.columns = results['QC']['names']
-                
-                for date_col in ['Outdate', 'Indate']:
-                    qc_df[date_col] = qc_df[date_col].apply(self.safe_date_parse)
-                
-                qc_df = qc_df.dropna(subset=['QC Branch', 'Total Rec.'])
-                if not qc_df.empty:
-                    qc_df['Processing Days'] = (qc_df['Indate'] - qc_df['Outdate']).dt.days
-                    qc_df['Week'] = qc_df['Indate'].dt.to_period('W').dt.start_time
-                    qc_df['Month'] = qc_df['Indate'].dt.to_period('M').dt.start_time
-                    qc_df['Process'] = 'QC'
-                
-                results['QC']['df'] = qc_df
-            except Exception as e:
-                messagebox.showwarning("QC Data Warning", 
-                                      f"Error processing QC data: {str(e)}\nContinuing without QC data.")
-                results['QC']['df'] = pd.DataFrame()
+            # Key, QC and Final are independent; pandas releases the GIL for much of their work
+            with ThreadPoolExecutor(max_workers=len(col_indices)) as executor:
+                futures = {process: executor.submit(self._process, input_df, col_indices[process],
+                                                    results[process]['names'], results[process]['name_col'],
+                                                    results[process]['date_cols'], results[process]['end_col'], process)
+                           for process in col_indices}
+                for process, future in futures.items():
+                    try:
+                        results[process]['df'] = future.result()
+                    except Exception as e:
+                        self._warnings.append((f"{process} Data Warning",
+                                               f"Error processing {process} data: {str(e)}\nContinuing without {process} data."))
+                        results[process]['df'] = pd.DataFrame()
 
-            # Process Final data (columns X-AC)
-            try:
-                final_cols = [self.excel_column_to_index(col) for col in results['Final']['cols']]
-                if None in final_cols:
-                    raise ValueError("Invalid column specification for Final data")
-                    
-                final_df = input_df.iloc[:, final_cols].copy()
-                final_df.columns = results['Final']['names']
-                
-                for date_col in ['Outdate', 'Indate', 'Shipment Date']:
-                    final_df[date_col] = final_df[date_col].apply(self.safe_date_parse)
-                
-                final_df = final_df.dropna(subset=['Final Person', 'Total Rec.'])
-                if not final_df.empty:
-                    final_df['Processing Days'] = (final_df['Shipment Date'] - final_df['Outdate']).dt.days
-                    final_df['Week'] = final_df['Shipment Date'].dt.to_period('W').dt.start_time
-                    final_df['Month'] = final_df['Shipment Date'].dt.to_period('M').dt.start_time
-                    final_df['Process'] = 'Final'
-                
-                results['Final']['df'] = final_df
-            except Exception as e:
-                messagebox.showwarning("Final Data Warning", 
-                                     f"Error processing Final data: {str(e)}\nContinuing without Final data.")
-                results['Final']['df'] = pd.DataFrame()
-
-            # Generate personnel data
-            personnel_data = []
-            personnel_weekly = []
-            personnel_monthly = []
-            
-            # Process Key personnel
-            if results['Key']['df'] is not None and not results['Key']['df'].empty:
-                key_personnel = results['Key']['df'].copy()
-                personnel_data.append(key_personnel[['Key Branch', 'Total Rec.', 'Process']].rename(columns={'Key Branch': 'Name'}))
-                
-                # Weekly
-                key_weekly = key_personnel.groupby(['Week', 'Key Branch']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                key_weekly['Process'] = 'Key'
-                key_weekly = key_weekly.rename(columns={'Key Branch': 'Name'})
-                personnel_weekly.append(key_weekly)
-                
-                # Monthly
-                key_monthly = key_personnel.groupby(['Month', 'Key Branch']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                key_monthly['Process'] = 'Key'
-                key_monthly = key_monthly.rename(columns={'Key Branch': 'Name'})
-                personnel_monthly.append(key_monthly)
-            
-            # Process QC personnel
-            if results['QC']['df'] is not None and not results['QC']['df'].empty:
-                qc_personnel = results['QC']['df'].copy()
-                personnel_data.append(qc_personnel[['QC Branch', 'Total Rec.', 'Process']].rename(columns={'QC Branch': 'Name'}))
-                
-                # Weekly
-                qc_weekly = qc_personnel.groupby(['Week', 'QC Branch']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                qc_weekly['Process'] = 'QC'
-                qc_weekly = qc_weekly.rename(columns={'QC Branch': 'Name'})
-                personnel_weekly.append(qc_weekly)
-                
-                # Monthly
-                qc_monthly = qc_personnel.groupby(['Month', 'QC Branch']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                qc_monthly['Process'] = 'QC'
-                qc_monthly = qc_monthly.rename(columns={'QC Branch': 'Name'})
-                personnel_monthly.append(qc_monthly)
-            
-            # Process Final personnel
-            if results['Final']['df'] is not None and not results['Final']['df'].empty:
-                final_personnel = results['Final']['df'].copy()
-                personnel_data.append(final_personnel[['Final Person', 'Total Rec.', 'Process']].rename(columns={'Final Person': 'Name'}))
-                
-                # Weekly
-                final_weekly = final_personnel.groupby(['Week', 'Final Person']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                final_weekly['Process'] = 'Final'
-                final_weekly = final_weekly.rename(columns={'Final Person': 'Name'})
-                personnel_weekly.append(final_weekly)
+            # Build one long-form personnel frame across all processes
+            name_cols = {process: results[process]['name_col'] for process in ['Key', 'QC', 'Final']}
+            personnel_frames = []
+            for process, name_col in name_cols.items():
+                df = results[process]['df']
+                if df is not None and not df.empty:
+                    personnel_frames.append(
+                        df[['Week', 'Month', name_col, 'Process', 'Total Rec.']].rename(columns={name_col: 'Name'})
+                    )
+            
+            if personnel_frames:
+                personnel_long = pd.concat(personnel_frames, ignore_index=True)
+                # Name categories differ per process, so concat falls back to object; re-encode once
+                personnel_long['Name'] = personnel_long['Name'].astype('category')
+                # Aggregate the raw rows once; rows without a week are kept so overall totals can roll up from here
+                personnel_by_week = personnel_long.groupby(['Week', 'Name', 'Process'], sort=False, observed=True,
+                                                           dropna=False)['Total Rec.'].sum().reset_index()
                 
-                # Monthly
-                final_monthly = final_personnel.groupby(['Month', 'Final Person']).agg({
-                    'Total Rec.': 'sum'
-                }).reset_index()
-                final_monthly['Process'] = 'Final'
-                final_monthly = final_monthly.rename(columns={'Final Person': 'Name'})
-                personnel_monthly.append(final_monthly)
-            
-            # Combine all personnel data
-            if personnel_data:
+                # Overall personnel totals
                 try:
-                    personnel_report = pd.concat(personnel_data)
-                    personnel_report = personnel_report.groupby(['Name', 'Process'])['Total Rec.'].sum().reset_index()
+                    personnel_report = personnel_by_week.groupby(['Name', 'Process'], observed=True)['Total Rec.'].sum().reset_index()
                     personnel_report = personnel_report.sort_values(by='Total Rec.', ascending=False)
                     personnel_report.insert(0, 'S.No.', range(1, len(personnel_report) + 1))
                     results['Personnel']['df'] = personnel_report
                 except Exception as e:
-                    messagebox.showwarning("Personnel Report Warning", 
-                                         f"Error creating personnel report: {str(e)}")
+                    self._warnings.append(("Personnel Report Warning",
+                                           f"Error creating personnel report: {str(e)}"))
                     results['Personnel']['df'] = pd.DataFrame()
-            
-            # Combine weekly personnel data
-            if personnel_weekly:
+                
+                # Weekly personnel totals
                 try:
-                    personnel_weekly_report = pd.concat(personnel_weekly)
+                    personnel_weekly_report = personnel_by_week[personnel_by_week['Week'].notna()]
                     results['PersonnelWeekly']['df'] = personnel_weekly_report.sort_values(['Week', 'Total Rec.'], ascending=[True, False])
                 except Exception as e:
-                    messagebox.showwarning("Weekly Personnel Warning", 
-                                         f"Error creating weekly personnel report: {str(e)}")
+                    self._warnings.append(("Weekly Personnel Warning",
+                                           f"Error creating weekly personnel report: {str(e)}"))
                     results['PersonnelWeekly']['df'] = pd.DataFrame()
-            
-            # Combine monthly personnel data
-            if personnel_monthly:
+                
+                # Monthly personnel totals
                 try:
-                    personnel_monthly_report = pd.concat(personnel_monthly)
+                    personnel_monthly_report = personnel_long.groupby(['Month', 'Name', 'Process'], sort=False, observed=True)['Total Rec.'].sum().reset_index()
                     results['PersonnelMonthly']['df'] = personnel_monthly_report.sort_values(['Month', 'Total Rec.'], ascending=[True, False])
                 except Exception as e:
-                    messagebox.showwarning("Monthly Personnel Warning", 
-                                         f"Error creating monthly personnel report: {str(e)}")
+                    self._warnings.append(("Monthly Personnel Warning",
+                                           f"Error creating monthly personnel report: {str(e)}"))
                     results['PersonnelMonthly']['df'] = pd.DataFrame()
+                
+                # Group sums come back as int64/float64; shrink them before the rows are built for writing.
+                # Name and Process are still categorical from the grouping keys.
+                for key in ['Personnel', 'PersonnelWeekly', 'PersonnelMonthly']:
+                    df = results[key]['df']
+                    if df is not None and not df.empty:
+                        df['Total Rec.'] = pd.to_numeric(df['Total Rec.'], downcast='integer')
 
             # Generate process weekly reports
             weekly_data = []
@@ -422,28 +556,28 @@ class ProductionReporter:
                 df = results[process]['df']
                 if df is not None and not df.empty:
                     try:
-                        weekly = df.groupby(['Week', 'Process']).agg({
+                        weekly = df.groupby(['Week', 'Process'], observed=True).agg({
                             'Total Rec.': 'sum',
                             'Processing Days': 'mean'
                         }).reset_index()
                         weekly_data.append(weekly)
                     except Exception as e:
-                        print(f"Warning: Error aggregating weekly {process} data: {str(e)}")
+                        log.warning("Error aggregating weekly %s data: %s", process, e)
             
             if weekly_data:
                 try:
                     weekly_report = pd.concat(weekly_data)
-                    weekly_report = weekly_report.pivot_table(
-                        index='Week',
-                        columns='Process',
-                        values=['Total Rec.', 'Processing Days'],
-                        aggfunc='sum'
-                    ).fillna(0)
+                    # Rows are already aggregated per (Week, Process), so a plain reshape is enough
+                    weekly_report = weekly_report.set_index(['Week', 'Process'])[
+                        ['Total Rec.', 'Processing Days']
+                    ].unstack('Process').fillna(0)
                     weekly_report.columns = [' '.join(col).strip() for col in weekly_report.columns.values]
+                    # Same column order as the old pivot_table output
+                    weekly_report = weekly_report.sort_index(axis=1)
                     results['Weekly']['df'] = weekly_report.reset_index()
                 except Exception as e:
-                    messagebox.showwarning("Weekly Report Warning", 
-                                         f"Error creating weekly report: {str(e)}")
+                    self._warnings.append(("Weekly Report Warning",
+                                           f"Error creating weekly report: {str(e)}"))
                     results['Weekly']['df'] = pd.DataFrame()
             
             # Generate monthly report
@@ -452,217 +586,333 @@ class ProductionReporter:
                 df = results[process]['df']
                 if df is not None and not df.empty:
                     try:
-                        monthly = df.groupby(['Month', 'Process']).agg({
+                        monthly = df.groupby(['Month', 'Process'], observed=True).agg({
                             'Total Rec.': 'sum',
                             'Processing Days': 'mean'
                         }).reset_index()
                         monthly_data.append(monthly)
                     except Exception as e:
-                        print(f"Warning: Error aggregating monthly {process} data: {str(e)}")
+                        log.warning("Error aggregating monthly %s data: %s", process, e)
             
             if monthly_data:
                 try:
                     monthly_report = pd.concat(monthly_data)
-                    monthly_report = monthly_report.pivot_table(
-                        index='Month',
-                        columns='Process',
-                        values=['Total Rec.', 'Processing Days'],
-                        aggfunc='sum'
-                    ).fillna(0)
+                    # Rows are already aggregated per (Month, Process), so a plain reshape is enough
+                    monthly_report = monthly_report.set_index(['Month', 'Process'])[
+                        ['Total Rec.', 'Processing Days']
+                    ].unstack('Process').fillna(0)
                     monthly_report.columns = [' '.join(col).strip() for col in monthly_report.columns.values]
+                    # Same column order as the old pivot_table output
+                    monthly_report = monthly_report.sort_index(axis=1)
                     results['Monthly']['df'] = monthly_report.reset_index()
                 except Exception as e:
-                    messagebox.showwarning("Monthly Report Warning", 
-                                         f"Error creating monthly report: {str(e)}")
+                    self._warnings.append(("Monthly Report Warning",
+                                           f"Error creating monthly report: {str(e)}"))
                     results['Monthly']['df'] = pd.DataFrame()
             
             return results
         
         except Exception as e:
-            messagebox.showerror("Processing Error", 
-                               f"Critical error processing data:\n{str(e)}\n{traceback.format_exc()}")
+            log.error("Critical error processing data", exc_info=True)
+            self._notify('showerror', "Processing Error",
+                         f"Critical error processing data:\n{str(e)}")
             return None
 
-    def save_reports(self, processed_data):
-        """Save all reports to Excel with comprehensive error handling"""
+    def _build_formats(self, wb):
+        """Create the header and date formats shared by every sheet of the workbook"""
+        self._header_fmt = wb.add_format({'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#4F81BD', 'align': 'center'})
+        self._date_fmt = wb.add_format({'num_format': 'mm/dd/yyyy'})
+
+    def safe_add_data(self, ws, data, headers=None):
+        """Write header and rows to a worksheet, returning the number of rows written (0 on error)"""
+        try:
+            row_idx = 0
+            if headers:
+                ws.write_row(row_idx, 0, headers, self._header_fmt)
+                row_idx += 1
+            for row in data:
+                ws.write_row(row_idx, 0, row)
+                row_idx += 1
+            return row_idx
+        except (TypeError, ValueError, XlsxWriterException) as e:
+            # xlsxwriter cannot remove a worksheet, so the rows written before the error stay
+            self._warnings.append((f"{ws.get_name()} Sheet Warning",
+                                   f"Error adding data; the sheet may be incomplete: {str(e)}"))
+            return 0
+
+    def _personnel_rows(self, df, period_col, period_fmt, chart_period):
+        """Build the rows of a personnel-by-period sheet, or None when there is nothing to write"""
+        if df is None or df.empty:
+            return None
+        missing = [col for col in [period_col, 'Name', 'Process', 'Total Rec.'] if col not in df.columns]
+        if missing:
+            self._warnings.append((f"{chart_period} Personnel Sheet Warning",
+                                   f"Missing columns for {chart_period.lower()} personnel sheet: {', '.join(missing)}"))
+            return None
+        
+        periods = df[period_col].dt.strftime(period_fmt).to_numpy()
+        names = df['Name'].to_numpy()
+        procs = df['Process'].to_numpy()
+        totals = df['Total Rec.'].to_numpy()
+        return list(zip(periods, names, procs, totals))
+
+    def _write_personnel(self, wb, df, rows_future, title, period_col, chart_period):
+        """Write a personnel-by-period sheet and its trend chart from the rows built by _personnel_rows"""
+        headers = [period_col, 'Name', 'Process', 'Total Records']
+        try:
+            # Rows are built before the sheet is created, so a failed build adds no sheet
+            rows = rows_future.result()
+            if rows is None:
+                return
+            ws = wb.add_worksheet(title)
+            self.format_sheet(ws, headers, {period_col: period_col}, rows)
+            row_count = self.safe_add_data(ws, rows, headers)
+            if row_count:
+                self.add_personnel_trend_chart(wb, ws, df, chart_period, row_count)
+        except SHEET_ERRORS as e:
+            self._warnings.append((f"{chart_period} Personnel Sheet Warning",
+                                   f"Error creating {chart_period.lower()} personnel sheet: {str(e)}"))
+
+    def resolve_output_file(self, output_file):
+        """Return a writable output path, asking for another one while the chosen file is locked"""
+        while output_file:
+            if not os.path.exists(output_file):
+                return output_file
+            try:
+                # Probe before any XML is built; xlsxwriter would only fail at close
+                with open(output_file, 'r+b'):
+                    return output_file
+            except PermissionError:
+                message = f"Could not save {output_file}. The file may be open in another program."
+                if not self.interactive:
+                    self._notify('showerror', "Save Error", message)
+                    return None
+                self._notify('showwarning', "Save Error", f"{message}\nPlease choose another file name.")
+                output_file = self._filedialog.asksaveasfilename(
+                    title="Save Report As",
+                    initialfile=os.path.basename(output_file),
+                    defaultextension=".xlsx",
+                    filetypes=[("Excel files", "*.xlsx")]
+                )
+        return None
+
+    def save_reports(self, processed_data, output_file=OUTPUT_FILE):
+        """Save all reports to Excel, returning the (dialog, title, message) to show when done.
+
+        This runs on a worker thread, so it must not touch Tk; sheet warnings go to self._warnings.
+        """
         if not processed_data:
-            messagebox.showerror("Save Error", "No processed data to save.")
-            return
+            return ('showerror', "Save Error", "No processed data to save.")
         
+        wb = None
         try:
-            wb = Workbook()
-            wb.remove(wb.active)
-            
-            # Helper function to safely add data to worksheet
-            def safe_add_data(ws, data, headers=None):
-                try:
-                    if headers:
-                        ws.append(headers)
-                    for row in data:
-                        ws.append(row)
-                    return True
-                except Exception as e:
-                    print(f"Warning: Error adding data to sheet {ws.title}: {str(e)}")
-                    return False
-            
-            # Create process sheets
-            for process_name in ['Key', 'QC', 'Final']:
-                data = processed_data[process_name]
-                if data['df'] is not None and not data['df'].empty:
+            # constant_memory streams each row to a temp file once the next row starts, so every sheet
+            # writes its rows strictly top to bottom: column setup first, then header, data and chart scratch rows
+            wb = xlsxwriter.Workbook(output_file, {'constant_memory': True, 'strings_to_numbers': False,
+                                                   'nan_inf_to_errors': True})
+            self._build_formats(wb)
+            
+            # The personnel period rows are pure pandas/NumPy work, so build them on worker threads
+            # while the sheets below are written; the workbook itself is only touched from this thread
+            personnel_periods = [
+                (processed_data['PersonnelWeekly']['df'], "Personnel Weekly", 'Week', '%Y-%m-%d', "Weekly"),
+                (processed_data['PersonnelMonthly']['df'], "Personnel Monthly", 'Month', '%Y-%m', "Monthly"),
+            ]
+            # The with block joins the workers even when a sheet build raises
+            with ThreadPoolExecutor(max_workers=2) as row_executor:
+                personnel_futures = [row_executor.submit(self._personnel_rows, df, period_col, period_fmt, chart_period)
+                                     for df, _, period_col, period_fmt, chart_period in personnel_periods]
+                
+                # Create process sheets
+                for process_name in ['Key', 'QC', 'Final']:
+                    df = processed_data[process_name]['df']
+                    if df is None or df.empty:
+                        continue
+                
+                    if process_name == 'Key':
+                        headers = ['S.No.', 'Key Branch', 'Start Date', 'Due Date', 
+                                 'End Date', 'Total Records', 'Processing Days', 'Status']
+                        date_cols = {'Start Date': 'Outdate', 'Due Date': 'Duedate', 'End Date': 'Indate'}
+                        cols = ['Key Branch', 'Outdate', 'Duedate', 'Indate',
+                                'Total Rec.', 'Processing Days', 'On Time Status']
+                    elif process_name == 'QC':
+                        headers = ['S.No.', 'QC Branch', 'Start Date', 'End Date', 
+                                 'Total Records', 'Processing Days']
+                        date_cols = {'Start Date': 'Outdate', 'End Date': 'Indate'}
+                        cols = ['QC Branch', 'Outdate', 'Indate', 'Total Rec.', 'Processing Days']
+                    else:
+                        headers = ['S.No.', 'Final Person', 'Start Date', 'QC End Date',
+                                 'Shipment Date', 'Total Records', 'Processing Days', 'Status']
+                        date_cols = {'Start Date': 'Outdate', 'QC End Date': 'Indate', 'Shipment Date': 'Shipment Date'}
+                        cols = ['Final Person', 'Outdate', 'Indate', 'Shipment Date',
+                                'Total Rec.', 'Processing Days', 'Status']
+                
+                    missing = [col for col in cols if col not in df.columns]
+                    if missing:
+                        self._warnings.append((f"{process_name} Sheet Warning",
+                                               f"Missing columns for {process_name} sheet: {', '.join(missing)}"))
+                        continue
+                
                     try:
-                        ws = wb.create_sheet(title=f"{process_name} Process")
-                        
-                        if process_name == 'Key':
-                            headers = ['S.No.', 'Key Branch', 'Start Date', 'Due Date', 
-                                     'End Date', 'Total Records', 'Processing Days', 'Status']
-                            date_cols = {'Start Date': 'Outdate', 'Due Date': 'Duedate', 'End Date': 'Indate'}
-                            rows = []
-                            for i, (_, row) in enumerate(data['df'].iterrows(), 1):
-                                rows.append([
-                                    i, row['Key Branch'], row['Outdate'], row['Duedate'],
-                                    row['Indate'], row['Total Rec.'], row['Processing Days'], row['On Time Status']
-                                ])
-                        elif process_name == 'QC':
-                            headers = ['S.No.', 'QC Branch', 'Start Date', 'End Date', 
-                                     'Total Records', 'Processing Days']
-                            date_cols = {'Start Date': 'Outdate', 'End Date': 'Indate'}
-                            rows = []
-                            for i, (_, row) in enumerate(data['df'].iterrows(), 1):
-                                rows.append([
-                                    i, row['QC Branch'], row['Outdate'], row['Indate'],
-                                    row['Total Rec.'], row['Processing Days']
-                                ])
-                        else:
-                            headers = ['S.No.', 'Final Person', 'Start Date', 'QC End Date',
-                                     'Shipment Date', 'Total Records', 'Processing Days', 'Status']
-                            date_cols = {'Start Date': 'Outdate', 'QC End Date': 'Indate', 'Shipment Date': 'Shipment Date'}
-                            rows = []
-                            for i, (_, row) in enumerate(data['df'].iterrows(), 1):
-                                rows.append([
-                                    i, row['Final Person'], row['Outdate'], row['Indate'],
-                                    row['Shipment Date'], row['Total Rec.'], row['Processing Days'], row['Status']
-                                ])
-                        
-                        if safe_add_data(ws, rows, headers):
-                            self.format_sheet(ws, headers, date_cols)
-                    except Exception as e:
-                        messagebox.showwarning(f"{process_name} Sheet Warning", 
-                                            f"Error creating {process_name} sheet: {str(e)}")
-            
-            # Create Weekly/Monthly reports
-            for report_type in ['Weekly', 'Monthly']:
-                data = processed_data[report_type]
-                if data['df'] is not None and not data['df'].empty:
+                        sheet_df = df[cols]
+                        sheet_df.insert(0, 'S.No.', range(1, len(sheet_df) + 1))
+                        # Missing dates and values become blank cells; xlsxwriter cannot write NaT
+                        sheet_values = sheet_df.astype(object).where(sheet_df.notna(), None)
+                        rows = list(sheet_values.itertuples(index=False, name=None))
+                    
+                        ws = wb.add_worksheet(f"{process_name} Process")
+                        self.format_sheet(ws, headers, date_cols, rows, sheet_df)
+                        self.safe_add_data(ws, rows, headers)
+                    except SHEET_ERRORS as e:
+                        self._warnings.append((f"{process_name} Sheet Warning",
+                                               f"Error creating {process_name} sheet: {str(e)}"))
+            
+                # Create Weekly/Monthly reports
+                for report_type in ['Weekly', 'Monthly']:
+                    df = processed_data[report_type]['df']
+                    if df is None or df.empty:
+                        continue
+                
                     try:
-                        ws = wb.create_sheet(title=f"{report_type} Report")
-                        rows = []
-                        for r in dataframe_to_rows(data['df'], index=False, header=True):
-                            rows.append(r)
-                        
-                        if safe_add_data(ws, rows):
-                            self.format_sheet(ws, list(data['df'].columns), {})
-                            self.add_production_chart(ws, data['df'], report_type)
-                    except Exception as e:
-                        messagebox.showwarning(f"{report_type} Report Warning", 
-                                              f"Error creating {report_type} report: {str(e)}")
-            
-            # Create Personnel reports
-            if processed_data['Personnel']['df'] is not None and not processed_data['Personnel']['df'].empty:
-                try:
-                    ws_personnel = wb.create_sheet(title="Personnel Performance")
+                        headers = list(df.columns)
+                        rows = df.to_numpy().tolist()
+                        ws = wb.add_worksheet(f"{report_type} Report")
+                        # The first column holds the period start dates
+                        self.format_sheet(ws, headers, {headers[0]: headers[0]}, rows, df)
+                        row_count = self.safe_add_data(ws, rows, headers)
+                        if row_count:
+                            self.add_production_chart(wb, ws, df, report_type, row_count)
+                    except SHEET_ERRORS as e:
+                        self._warnings.append((f"{report_type} Report Warning",
+                                               f"Error creating {report_type} report: {str(e)}"))
+            
+                # Create Personnel reports
+                personnel_df = processed_data['Personnel']['df']
+                personnel_cols = ['S.No.', 'Name', 'Process', 'Total Rec.']
+                if personnel_df is not None and not personnel_df.empty:
+                    missing = [col for col in personnel_cols if col not in personnel_df.columns]
+                    if missing:
+                        self._warnings.append(("Personnel Sheet Warning",
+                                               f"Missing columns for personnel sheet: {', '.join(missing)}"))
+                        personnel_df = None
+                if personnel_df is not None and not personnel_df.empty:
                     headers = ['S.No.', 'Name', 'Process', 'Total Records']
-                    rows = []
-                    for _, row in processed_data['Personnel']['df'].iterrows():
-                        rows.append([row['S.No.'], row['Name'], row['Process'], row['Total Rec.']])
-                    
-                    if safe_add_data(ws_personnel, rows, headers):
-                        self.format_sheet(ws_personnel, headers, {})
-                        self.add_personnel_chart(ws_personnel, processed_data['Personnel']['df'])
-                except Exception as e:
-                    messagebox.showwarning("Personnel Sheet Warning", 
-                                         f"Error creating personnel sheet: {str(e)}")
-            
-            if processed_data['PersonnelWeekly']['df'] is not None and not processed_data['PersonnelWeekly']['df'].empty:
-                try:
-                    ws_personnel_weekly = wb.create_sheet(title="Personnel Weekly")
-                    headers = ['Week', 'Name', 'Process', 'Total Records']
-                    rows = []
-                    for _, row in processed_data['PersonnelWeekly']['df'].iterrows():
-                        rows.append([
-                            row['Week'].strftime('%Y-%m-%d'),
-                            row['Name'],
-                            row['Process'],
-                            row['Total Rec.']
-                        ])
-                    
-                    if safe_add_data(ws_personnel_weekly, rows, headers):
-                        self.format_sheet(ws_personnel_weekly, headers, {'Week': 'Week'})
-                        self.add_personnel_trend_chart(ws_personnel_weekly, processed_data['PersonnelWeekly']['df'], "Weekly")
-                except Exception as e:
-                    messagebox.showwarning("Weekly Personnel Sheet Warning", 
-                                         f"Error creating weekly personnel sheet: {str(e)}")
-            
-            if processed_data['PersonnelMonthly']['df'] is not None and not processed_data['PersonnelMonthly']['df'].empty:
-                try:
-                    ws_personnel_monthly = wb.create_sheet(title="Personnel Monthly")
-                    headers = ['Month', 'Name', 'Process', 'Total Records']
-                    rows = []
-                    for _, row in processed_data['PersonnelMonthly']['df'].iterrows():
-                        rows.append([
-                            row['Month'].strftime('%Y-%m'),
-                            row['Name'],
-                            row['Process'],
-                            row['Total Rec.']
-                        ])
-                    
-                    if safe_add_data(ws_personnel_monthly, rows, headers):
-                        self.format_sheet(ws_personnel_monthly, headers, {'Month': 'Month'})
-                        self.add_personnel_trend_chart(ws_personnel_monthly, processed_data['PersonnelMonthly']['df'], "Monthly")
-                except Exception as e:
-                    messagebox.showwarning("Monthly Personnel Sheet Warning", 
-                                        f"Error creating monthly personnel sheet: {str(e)}")
+                    try:
+                        sheet_df = personnel_df[personnel_cols]
+                        rows = list(sheet_df.itertuples(index=False, name=None))
+                        ws_personnel = wb.add_worksheet("Personnel Performance")
+                        self.format_sheet(ws_personnel, headers, {}, rows, sheet_df)
+                        if self.safe_add_data(ws_personnel, rows, headers):
+                            self.add_personnel_chart(wb, ws_personnel, personnel_df)
+                    except SHEET_ERRORS as e:
+                        self._warnings.append(("Personnel Sheet Warning",
+                                               f"Error creating personnel sheet: {str(e)}"))
+            
+                for (df, title, period_col, _, chart_period), future in zip(personnel_periods, personnel_futures):
+                    self._write_personnel(wb, df, future, title, period_col, chart_period)
             
             # Save file
-            output_file = "Production_Performance_Report.xlsx"
             try:
-                wb.save(output_file)
-                messagebox.showinfo("Success", f"Report successfully saved as {output_file}")
-            except PermissionError:
-                messagebox.showerror("Save Error", 
-                                   f"Could not save {output_file}. The file may be open in another program.")
+                # Take the workbook out of wb so the finally block does not close it a second time
+                workbook, wb = wb, None
+                workbook.close()
+                return ('showinfo', "Success", f"Report successfully saved as {output_file}")
+            except (PermissionError, FileCreateError):
+                return ('showerror', "Save Error",
+                        f"Could not save {output_file}. The file may be open in another program.")
             except Exception as e:
-                messagebox.showerror("Save Error", 
-                                  f"Error saving file: {str(e)}")
+                return ('showerror', "Save Error", f"Error saving file: {str(e)}")
         
         except Exception as e:
-            messagebox.showerror("Report Generation Error", 
-                              f"Critical error generating reports:\n{str(e)}")
+            return ('showerror', "Report Generation Error",
+                    f"Critical error generating reports:\n{str(e)}")
+        finally:
+            # Still close after an error so constant_memory's temp files are removed
+            if wb is not None:
+                try:
+                    wb.close()
+                except Exception as e:
+                    log.warning("Error closing workbook after a failed save: %s", e)
 
-    def run(self):
+    def _poll_save(self, future):
+        """Check the background save from the Tk loop and report its outcome once finished"""
+        if not future.done():
+            self.root.after(100, self._poll_save, future)
+            return
+        try:
+            self.flush_warnings()
+            dialog, title, message = future.result()
+            self._notify(dialog, title, message)
+        except Exception as e:
+            self._notify('showerror', "Report Generation Error",
+                         f"Critical error generating reports:\n{str(e)}")
+        finally:
+            self.root.quit()
+
+    def run(self, input_file=None):
         """Main execution method with full error handling"""
         try:
-            input_file = self.select_file()
+            if input_file is None:
+                input_file = self.select_file()
             if not input_file:
                 return
             
             try:
-                input_df = pd.read_excel(input_file)
+                input_df = self.load_cached(input_file)
+            except FileNotFoundError:
+                self._notify('showerror', "File Read Error", f"Input file not found:\n{input_file}")
+                return
+            except PermissionError:
+                self._notify('showerror', "File Read Error",
+                             f"Cannot open {input_file}. The file may be open in another program.")
+                return
+            except pd.errors.ParserError as e:
+                self._notify('showerror', "File Read Error", f"Could not parse input file:\n{str(e)}")
+                return
             except Exception as e:
-                messagebox.showerror("File Read Error", 
-                                    f"Error reading input file:\n{str(e)}")
+                self._notify('showerror', "File Read Error",
+                             f"Error reading input file:\n{str(e)}")
                 return
             
             processed_data = self.process_input_data(input_df)
+            self.flush_warnings("Data Warnings")
             
-            if processed_data is not None:
-                self.save_reports(processed_data)
+            if processed_data is None:
+                return
+            # Dialogs must run on the Tk thread, so the output path is settled before the save starts
+            output_file = self.resolve_output_file(OUTPUT_FILE)
+            if not output_file:
+                return
             
+            if not self.interactive:
+                dialog, title, message = self.save_reports(processed_data, output_file)
+                self.flush_warnings()
+                self._notify(dialog, title, message)
+            else:
+                # Build and write the workbook on a worker so the Tk loop stays responsive
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    future = executor.submit(self.save_reports, processed_data, output_file)
+                    self.root.after(100, self._poll_save, future)
+                    self.root.mainloop()
+            
+        # Common failures get a short message; only unexpected errors carry the traceback
+        except (FileNotFoundError, PermissionError) as e:
+            self._notify('showerror', "Application Error", str(e))
         except Exception as e:
-            messagebox.showerror("Application Error", 
-                               f"Unexpected error:\n{str(e)}\n{traceback.format_exc()}")
+            self._notify('showerror', "Application Error",
+                         f"Unexpected error:\n{str(e)}\n{traceback.format_exc()}")
         finally:
-            self.root.quit()
+            if self.root is not None:
+                self.root.quit()
 
 if __name__ == "__main__":
-    app = ProductionReporter()
-    app.run()
+    parser = argparse.ArgumentParser(description="Generate the production performance report workbook")
+    parser.add_argument('input_file', nargs='?', help="input Excel file (asked for in a dialog when omitted)")
+    parser.add_argument('--batch', action='store_true', help="run without Tk, logging messages instead of showing dialogs")
+    args = parser.parse_args()
+    if args.batch and not args.input_file:
+        parser.error("--batch requires an input file")
+    
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    app = ProductionReporter(interactive=not args.batch)
+    app.run(args.input_file)